@@ -1,30 +1,344 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from flask import Flask, request
 from appwrite_client import AppwriteClient
-from recommendation_engine import JobRecommendationEngine
+from recommendation_engine import JobRecommendationEngine, PROFILE_FIELDS
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache, partial
+import gzip
+import hashlib
+import numpy as np
+import orjson
 import os
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+# INFO by default; LOG_LEVEL=DEBUG turns on the engine's per-request debug output
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-CORS(app, origins=['*'])  # Allow all origins for deployment
+
+# Allow all origins for deployment. The headers are fixed, so set them
+# directly on every response instead of running CORS middleware.
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+    # Lets cross-origin clients read the ETag and revalidate with If-None-Match
+    'Access-Control-Expose-Headers': 'ETag'
+}
+
+@app.after_request
+def add_cors_headers(response):
+    response.headers.update(CORS_HEADERS)
+    return response
+
+# Job lists repeat company names, skills and URLs, so JSON compresses well;
+# bodies smaller than this aren't worth the gzip framing
+COMPRESS_MIN_SIZE = 500
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+# Gzipped bodies are a different representation, so they get their own ETag
+GZIP_ETAG_SUFFIX = '-gzip'
+
+def accepts_gzip():
+    """True unless the client didn't list gzip (or *), or gave it q=0"""
+    return request.accept_encodings['gzip'] > 0
+
+@app.after_request
+def compress_response(response):
+    """Gzip JSON responses for clients that accept it"""
+    if response.mimetype != 'application/json' or response.is_streamed:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (
+        response.status_code != 200
+        or 'Content-Encoding' in response.headers
+        or not accepts_gzip()
+    ):
+        return response
+    data = response.get_data()
+    if len(data) >= COMPRESS_MIN_SIZE:
+        response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+    return response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def ojson(obj, status=200):
+    """JSON response encoded with orjson, which also takes NumPy scalars and arrays"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+def wants_ndjson():
+    """True when the client explicitly asked for newline-delimited JSON"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson(items):
+    """Streamed response with one orjson-encoded line per item, so the full body is never built"""
+    return app.response_class(
+        (orjson.dumps(item, option=orjson.OPT_SERIALIZE_NUMPY) + b'\n' for item in items),
+        mimetype=NDJSON_MIMETYPE
+    )
+
+def jobs_etag(jobs_version, *parts):
+    """ETag for a response computed from parts and the content version of the jobs it was built from"""
+    key = '|'.join(str(part) for part in (jobs_version,) + parts)
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+def profile_key(user_data):
+    """The profile fields scoring reads, as a stable string (None for an unknown user)"""
+    if not user_data:
+        return None
+    profile = {field: user_data.get(field) for field in PROFILE_FIELDS}
+    return orjson.dumps(profile, option=orjson.OPT_SORT_KEYS).decode()
+
+def not_modified(etag, vary=()):
+    """304 response when the client already holds the response for etag, else None"""
+    # The client may hold either representation; compress_response suffixes the gzipped one's ETag
+    tags = (etag + GZIP_ETAG_SUFFIX, etag) if accepts_gzip() else (etag,)
+    for tag in tags:
+        if request.if_none_match.contains_weak(tag):
+            # Repeat the headers the full response would carry
+            response = with_etag(app.response_class(status=304), tag)
+            response.vary.update(('Accept-Encoding',) + tuple(vary))
+            return response
+    return None
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    return response
+
+@lru_cache(maxsize=4096)
+def clearbit_logo(company):
+    """Clearbit logo URL for a company name"""
+    return f"https://logo.clearbit.com/{company.replace(' ', '').lower()}.com" if company else ''
+
+@dataclass(slots=True, kw_only=True)
+class FormattedJob:
+    """Job as returned to the frontend; orjson serializes these natively"""
+    id: str
+    title: str
+    company: str
+    location: str
+    description: str
+    type: str
+    skills: list
+    salary: str
+    apply_link: str
+    logo: str
+    posted: str = 'Recently'
+    source: str = 'Gigrithm'
+    
+    @classmethod
+    def from_job(cls, job, **extra):
+        return cls(
+            id=job.get('jobId') or job.get('$id', ''),
+            title=job.get('jobRole', ''),
+            company=job.get('companyName', ''),
+            location=job.get('location', ''),
+            description=job.get('description', ''),
+            type=job.get('jobType', ''),
+            skills=job.get('skills', []),
+            salary=job.get('stipend', 'Salary not specified'),
+            apply_link=job.get('applyLink', '#'),
+            logo=clearbit_logo(job.get('companyName', '')),
+            **extra
+        )
+
+@dataclass(slots=True, kw_only=True)
+class SearchJob(FormattedJob):
+    experienceLevel: str
+    category: str
+
+@dataclass(slots=True, kw_only=True)
+class ScoredJob(FormattedJob):
+    matchScore: float
+
+@dataclass(slots=True, kw_only=True)
+class RecommendedJob(ScoredJob):
+    recommendationReason: str
+
+class InvalidRequest(ValueError):
+    """Raised while parsing request input; routes answer it with a 400"""
+
+MAX_LIMIT = 500
+
+def parse_limit(value, default):
+    """Positive integer limit (at most MAX_LIMIT) from a query string value"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise InvalidRequest(f"limit must be an integer, got {value!r}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise InvalidRequest(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+def optional_str(data, key, default=None):
+    """String field from a JSON body; None and missing fall back to default"""
+    value = data.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise InvalidRequest(f"{key} must be a string")
+    return value
+
+@dataclass(slots=True, frozen=True)
+class RecommendationQuery:
+    """Query string accepted by /api/recommendations/<user_id>"""
+    limit: int = 10
+    jobType: str | None = None
+    location: str | None = None
+    category: str | None = None
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            limit=parse_limit(args.get('limit'), 10),
+            jobType=args.get('jobType') or None,
+            location=args.get('location') or None,
+            category=args.get('category') or None
+        )
+
+    def filters(self):
+        return {
+            key: value for key, value in (
+                ('jobType', self.jobType), ('location', self.location), ('category', self.category)
+            ) if value
+        }
+
+@dataclass(slots=True, frozen=True)
+class SearchQuery:
+    """Query string accepted by /api/search-jobs"""
+    q: str = ''
+    location: str = 'all'
+    type: str = 'all'
+    experience: str = 'all'
+    limit: int = 50
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            q=args.get('q', ''),
+            location=args.get('location', 'all'),
+            type=args.get('type', 'all'),
+            experience=args.get('experience', 'all'),
+            limit=parse_limit(args.get('limit'), 50)
+        )
+
+@dataclass(slots=True, frozen=True)
+class PersonalizedJobsRequest:
+    """JSON body accepted by /api/get-personalized-jobs"""
+    user_id: str | None = None
+    skills: list | str = ''
+    location: str = 'flexible'
+    job_type: str = 'internship'
+    experience_level: str = 'entry'
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict):
+            raise InvalidRequest('Request body must be a JSON object')
+        # A comma separated string is accepted too; the engine splits it
+        skills = data.get('skills') or []
+        if not isinstance(skills, str) and (
+            not isinstance(skills, list) or not all(isinstance(skill, str) for skill in skills)
+        ):
+            raise InvalidRequest('skills must be a list of strings')
+        return cls(
+            user_id=optional_str(data, 'user_id') or None,
+            skills=skills,
+            location=optional_str(data, 'location', 'flexible'),
+            job_type=optional_str(data, 'job_type', 'internship'),
+            experience_level=optional_str(data, 'experience_level', 'entry')
+        )
+
+MAX_BATCH_USERS = 50
+
+@dataclass(slots=True, frozen=True)
+class BatchRecommendRequest:
+    """JSON body accepted by /api/batch-recommend"""
+    users: tuple
+    limit: int = 10
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict):
+            raise InvalidRequest('Request body must be a JSON object')
+        users = data.get('users')
+        if not isinstance(users, list) or not users or not all(isinstance(user, str) and user for user in users):
+            raise InvalidRequest('users must be a non-empty list of user ids')
+        if len(users) > MAX_BATCH_USERS:
+            raise InvalidRequest(f"at most {MAX_BATCH_USERS} users per batch")
+        return cls(users=tuple(users), limit=parse_limit(data.get('limit'), 10))
+
+@dataclass(slots=True, frozen=True)
+class TrackActivityRequest:
+    """JSON body accepted by /api/track-activity"""
+    user_id: str
+    job_id: str
+
+    @classmethod
+    def from_json(cls, data):
+        if not isinstance(data, dict):
+            raise InvalidRequest('Request body must be a JSON object')
+        user_id = optional_str(data, 'user_id')
+        job_id = optional_str(data, 'job_id')
+        if not user_id or not job_id:
+            raise InvalidRequest('user_id and job_id are required')
+        return cls(user_id=user_id, job_id=job_id)
+
+def bad_request(error, **extra):
+    return ojson({'success': False, 'message': str(error), **extra}, 400)
 
 # Initialize clients
 appwrite_client = AppwriteClient()
 recommendation_engine = JobRecommendationEngine(appwrite_client)
 
+# Keep the 500-job catalog (and its scoring index) fresh in the background,
+# ahead of the cache TTL. A changed catalog is indexed before it is published
+# to the cache, so requests never wait on the fetch or the rebuild
+JOBS_REFRESH_INTERVAL = float(os.getenv('JOBS_REFRESH_INTERVAL', int(os.getenv('JOBS_CACHE_TTL', 60)) * 0.75))
+if JOBS_REFRESH_INTERVAL > 0:
+    appwrite_client.start_jobs_refresher(
+        JOBS_REFRESH_INTERVAL, limit=500, on_refresh=recommendation_engine.get_job_index
+    )
+
+# Activity writes happen off the request path. Each write rewrites the whole
+# list, so a single writer thread keeps clicks for the same user in order within
+# this worker process. Separate gunicorn workers each have their own writer, and
+# concurrent clicks for one user landing on different workers can still lose one.
+activity_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='activity-writer')
+
+def log_failed_activity_write(user_id, job_id, future):
+    """Done callback for queued activity writes; update_user_activity returns None on failure"""
+    error = future.exception()
+    if error is not None or future.result() is None:
+        logger.error(f"Failed to record activity for user {user_id}, job {job_id}: {error or 'update failed'}")
+
+# Users in a batch are scored side by side. Threads rather than processes: the
+# jobs catalog and its fitted index are shared in memory, and the per-user work
+# is Appwrite round trips plus NumPy/SciPy kernels that release the GIL.
+batch_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='batch-recommend')
+
 @app.route('/')
 def home():
     logger.info("Home route accessed")
-    return jsonify({
+    return ojson({
         'message': 'Job Recommendation API',
         'status': 'running',
         'endpoints': {
             'health': '/api/health',
             'test': '/api/test',
             'recommendations': '/api/recommendations/<user_id>',
+            'batch_recommend': '/api/batch-recommend',
             'personalized_jobs': '/api/get-personalized-jobs',
             'search_jobs': '/api/search-jobs',
             'user_activity_insights': '/api/user-activity-insights/<user_id>',
@@ -35,14 +349,14 @@ def home():
 @app.route('/api/health', methods=['GET'])
 def health_check():
     logger.info("Health check accessed")
-    return jsonify({'status': 'healthy', 'message': 'Job Recommendation API is running'})
+    return ojson({'status': 'healthy', 'message': 'Job Recommendation API is running'})
 
 @app.route('/api/test', methods=['GET'])
 def test_route():
     logger.info("Test route accessed")
     # Test Appwrite connection
     is_connected, message = appwrite_client.test_connection()
-    return jsonify({
+    return ojson({
         'success': True, 
         'message': 'Test route working!',
         'appwrite_connection': is_connected,
@@ -54,12 +368,54 @@ def get_user(user_id):
     try:
         user = appwrite_client.get_user(user_id)
         if user:
-            return jsonify({'success': True, 'user': user})
+            return ojson({'success': True, 'user': user})
         else:
-            return jsonify({'success': False, 'message': 'User not found'}), 404
+            return ojson({'success': False, 'message': 'User not found'}, 404)
     except Exception as e:
         logger.error(f"Error in get_user: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojson({'success': False, 'message': str(e)}, 500)
+
+# Engine scores shown in a recommendation, in the order percent_scores returns them
+RECOMMENDATION_SCORES = (
+    'score', 'skill_score', 'location_score', 'experience_score', 'content_similarity', 'activity_score'
+)
+
+def percent_scores(recommendations, fields=('score',)):
+    """Rows of each recommendation's scores as percentages, rounded to 2 places in one NumPy pass"""
+    scores = np.array([[rec[field] for field in fields] for rec in recommendations], dtype=float)
+    return (scores.reshape(-1, len(fields)) * 100).round(2).tolist()
+
+def format_recommendation(rec, percents):
+    """Response shape of one engine recommendation; percents is its percent_scores row"""
+    score, skill, location, experience, content, activity = percents
+    job = rec['job']
+    # Only descriptions that are actually cut get the ellipsis
+    description = job.get('description') or ''
+    return {
+        'job': {
+            'jobId': job.get('jobId') or job.get('$id'),
+            'jobRole': job.get('jobRole'),
+            'companyName': job.get('companyName'),
+            'description': description[:200] + '...' if len(description) > 200 else description,
+            'location': job.get('location'),
+            'jobType': job.get('jobType'),
+            'experienceLevel': job.get('experienceLevel'),
+            'skills': job.get('skills', []),
+            'applyLink': job.get('applyLink'),
+            'stipend': job.get('stipend'),
+            'category': job.get('category')
+        },
+        'matchScore': score,
+        'matchBreakdown': {
+            'skillMatch': skill,
+            'locationMatch': location,
+            'experienceMatch': experience,
+            'contentSimilarity': content,
+            'activityScore': activity
+        },
+        'recommendationReason': rec['recommendation_reason'],
+        'hasActivityData': rec['has_activity_data']
+    }
 
 @app.route('/api/recommendations/<user_id>', methods=['GET'])
 def get_recommendations(user_id):
@@ -67,19 +423,9 @@ def get_recommendations(user_id):
         logger.info(f"Getting recommendations for user: {user_id}")
         
         # Get query parameters
-        num_recommendations = int(request.args.get('limit', 10))
-        job_type = request.args.get('jobType')
-        location = request.args.get('location')
-        category = request.args.get('category')
-        
-        # Build filters
-        filters = {}
-        if job_type:
-            filters['jobType'] = job_type
-        if location:
-            filters['location'] = location
-        if category:
-            filters['category'] = category
+        params = RecommendationQuery.from_args(request.args)
+        num_recommendations = params.limit
+        filters = params.filters()
         
         # Get recommendations
         if filters:
@@ -91,91 +437,102 @@ def get_recommendations(user_id):
                 user_id, num_recommendations
             )
         
-        # Format response
-        formatted_recommendations = []
-        for rec in recommendations:
-            job = rec['job']
-            formatted_recommendations.append({
-                'job': {
-                    'jobId': job.get('jobId') or job.get('$id'),
-                    'jobRole': job.get('jobRole'),
-                    'companyName': job.get('companyName'),
-                    'description': job.get('description', '')[:200] + '...' if job.get('description') else '',
-                    'location': job.get('location'),
-                    'jobType': job.get('jobType'),
-                    'experienceLevel': job.get('experienceLevel'),
-                    'skills': job.get('skills', []),
-                    'applyLink': job.get('applyLink'),
-                    'stipend': job.get('stipend'),
-                    'category': job.get('category')
-                },
-                'matchScore': round(rec['score'] * 100, 2),
-                'matchBreakdown': {
-                    'skillMatch': round(rec['skill_score'] * 100, 2),
-                    'locationMatch': round(rec['location_score'] * 100, 2),
-                    'experienceMatch': round(rec['experience_score'] * 100, 2),
-                    'contentSimilarity': round(rec['content_similarity'] * 100, 2),
-                    'activityScore': round(rec['activity_score'] * 100, 2)
-                },
-                'recommendationReason': rec['recommendation_reason'],
-                'hasActivityData': rec['has_activity_data']
-            })
+        formatted_recommendations = [
+            format_recommendation(rec, percents)
+            for rec, percents in zip(recommendations, percent_scores(recommendations, RECOMMENDATION_SCORES))
+        ]
         
-        return jsonify({
+        return ojson({
             'success': True,
             'recommendations': formatted_recommendations,
             'total': len(formatted_recommendations),
             'userId': user_id
         })
         
+    except InvalidRequest as e:
+        return bad_request(e)
     except Exception as e:
         logger.error(f"Error in get_recommendations: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojson({'success': False, 'message': str(e)}, 500)
+
+def recommend_for_user(user_id, limit):
+    """One entry of a batch response; a failing user doesn't fail the batch"""
+    try:
+        recs = recommendation_engine.get_recommendations(user_id, limit)
+        recommendations = [
+            format_recommendation(rec, percents)
+            for rec, percents in zip(recs, percent_scores(recs, RECOMMENDATION_SCORES))
+        ]
+        return {'userId': user_id, 'success': True, 'recommendations': recommendations, 'total': len(recommendations)}
+    except Exception as e:
+        logger.error(f"Error in batch recommendation for {user_id}: {str(e)}")
+        return {'userId': user_id, 'success': False, 'message': str(e)}
+
+@app.route('/api/batch-recommend', methods=['POST'])
+def batch_recommend():
+    try:
+        params = BatchRecommendRequest.from_json(request.get_json(silent=True))
+        results = list(batch_executor.map(recommend_for_user, params.users, [params.limit] * len(params.users)))
+        return ojson({'success': True, 'results': results, 'total': len(results)})
+    except InvalidRequest as e:
+        return bad_request(e)
+    except Exception as e:
+        logger.error(f"Error in batch_recommend: {str(e)}")
+        return ojson({'success': False, 'message': str(e)}, 500)
 
 @app.route('/api/get-personalized-jobs', methods=['POST'])
 def get_personalized_jobs():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         logger.info(f"Getting personalized jobs with data: {data}")
         
         # Extract parameters from request
-        user_id = data.get('user_id')  # If user is logged in
-        skills = data.get('skills', [])
-        location = data.get('location', 'flexible')
-        job_type = data.get('job_type', 'internship')
-        experience_level = data.get('experience_level', 'entry')
+        params = PersonalizedJobsRequest.from_json(data)
+        user_id = params.user_id  # If user is logged in
+        skills = params.skills
+        location = params.location
+        job_type = params.job_type
+        experience_level = params.experience_level
+        
+        # Fetched once, for both the ETag and the recommendations
+        user_data = appwrite_client.get_user(user_id) if user_id else None
+        
+        # Identical requests against the same jobs snapshot (and, for logged in
+        # users, the same profile and recent activity) get the same response.
+        # Both branches score the cached 500-job catalog
+        etag = jobs_etag(
+            appwrite_client.get_jobs_snapshot_version(),
+            'personalized',
+            orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode(),
+            profile_key(user_data) if user_id else '',
+            recommendation_engine.get_user_activity_job_ids(user_id) if user_id else ''
+        )
+        cached_response = not_modified(etag)
+        if cached_response:
+            return cached_response
         
         # If user_id provided, use enhanced recommendation system
         if user_id:
-            recommendations = recommendation_engine.get_recommendations(user_id, 20)
+            # An unknown user gets no recommendations (and an ETag that changes once they exist)
+            recommendations = recommendation_engine.get_recommendations(
+                user_id, 20, user_data=user_data
+            ) if user_data else []
             
             # Format jobs for frontend
-            formatted_jobs = []
-            for rec in recommendations:
-                job = rec['job']
-                formatted_jobs.append({
-                    'id': job.get('jobId') or job.get('$id', ''),
-                    'title': job.get('jobRole', ''),
-                    'company': job.get('companyName', ''),
-                    'location': job.get('location', ''),
-                    'description': job.get('description', ''),
-                    'type': job.get('jobType', ''),
-                    'skills': job.get('skills', []),
-                    'salary': job.get('stipend', 'Salary not specified'),
-                    'apply_link': job.get('applyLink', '#'),
-                    'posted': 'Recently',
-                    'logo': f"https://logo.clearbit.com/{job.get('companyName', '').replace(' ', '').lower()}.com",
-                    'source': 'Gigrithm',
-                    'matchScore': round(rec['score'] * 100, 2),
-                    'recommendationReason': rec['recommendation_reason']
-                })
+            formatted_jobs = [
+                RecommendedJob.from_job(
+                    rec['job'],
+                    matchScore=score,
+                    recommendationReason=rec['recommendation_reason']
+                ) for rec, (score,) in zip(recommendations, percent_scores(recommendations))
+            ]
             
-            return jsonify({
+            return with_etag(ojson({
                 'success': True,
                 'jobs': formatted_jobs,
                 'total': len(formatted_jobs),
                 'personalized': True
-            })
+            }), etag)
         
         # If no user_id, use basic filtering
         else:
@@ -190,7 +547,7 @@ def get_personalized_jobs():
             # Get all jobs first
             jobs_response = appwrite_client.get_jobs(limit=500)
             if not jobs_response or not jobs_response.get('documents'):
-                return jsonify({
+                return ojson({
                     'success': False,
                     'message': 'No jobs found',
                     'jobs': []
@@ -198,100 +555,72 @@ def get_personalized_jobs():
             
             jobs = jobs_response['documents']
             
-            # Calculate scores for each job using the recommendation engine logic
-            job_scores = []
-            
-            for job in jobs:
-                if not job.get('jobId') and not job.get('$id'):
-                    continue
-                if not job.get('jobRole'):
-                    continue
-                
-                # Filter by job type if specified
-                if job_type != 'all' and job.get('jobType', '').lower() != job_type.lower():
-                    continue
-                
-                # Calculate similarity scores
-                skill_score = recommendation_engine.calculate_skill_similarity(
-                    skills, job.get('skills', [])
-                )
-                
-                location_score = recommendation_engine.calculate_location_match(
-                    location, job.get('location', '')
-                )
-                
-                experience_score = recommendation_engine.calculate_experience_match(
-                    experience_level, job.get('experienceLevel', '')
-                )
-                
-                # Content similarity
-                content_similarity = recommendation_engine.calculate_content_similarity(mock_user_data, job)
-                
-                # Weighted final score
-                final_score = (
-                    skill_score * 0.4 +
-                    content_similarity * 0.3 +
-                    location_score * 0.2 +
-                    experience_score * 0.1
-                )
-                
-                job_scores.append({
-                    'job': job,
-                    'score': final_score,
-                    'skill_score': skill_score,
-                    'location_score': location_score,
-                    'experience_score': experience_score,
-                    'content_similarity': content_similarity
-                })
-            
-            # Sort by score
-            job_scores.sort(key=lambda x: x['score'], reverse=True)
+            # Top 20 for the profile, on the same vectorized pipeline as logged in users
+            job_scores = recommendation_engine.score_jobs(mock_user_data, jobs, top_k=20, job_type=job_type)
             
             # Format jobs for frontend
-            formatted_jobs = []
-            for rec in job_scores[:20]:  # Return top 20
-                job = rec['job']
-                formatted_jobs.append({
-                    'id': job.get('jobId') or job.get('$id', ''),
-                    'title': job.get('jobRole', ''),
-                    'company': job.get('companyName', ''),
-                    'location': job.get('location', ''),
-                    'description': job.get('description', ''),
-                    'type': job.get('jobType', ''),
-                    'skills': job.get('skills', []),
-                    'salary': job.get('stipend', 'Salary not specified'),
-                    'apply_link': job.get('applyLink', '#'),
-                    'posted': 'Recently',
-                    'logo': f"https://logo.clearbit.com/{job.get('companyName', '').replace(' ', '').lower()}.com",
-                    'source': 'Gigrithm',
-                    'matchScore': round(rec['score'] * 100, 2)
-                })
+            formatted_jobs = [
+                ScoredJob.from_job(rec['job'], matchScore=score)
+                for rec, (score,) in zip(job_scores, percent_scores(job_scores))
+            ]
             
-            return jsonify({
+            return with_etag(ojson({
                 'success': True,
                 'jobs': formatted_jobs,
                 'total': len(formatted_jobs),
                 'personalized': False
-            })
+            }), etag)
         
+    except InvalidRequest as e:
+        return bad_request(e, jobs=[])
     except Exception as e:
         logger.error(f"Error in get_personalized_jobs: {str(e)}")
-        return jsonify({'success': False, 'message': str(e), 'jobs': []}), 500
+        return ojson({'success': False, 'message': str(e), 'jobs': []}, 500)
+
+def search_results(jobs, limit):
+    """Up to limit usable jobs from jobs, formatted for the search response"""
+    count = 0
+    for job in jobs:
+        if not job.get('jobId') and not job.get('$id'):
+            continue
+        if not job.get('jobRole'):
+            continue
+        
+        yield SearchJob.from_job(
+            job,
+            experienceLevel=job.get('experienceLevel', ''),
+            category=job.get('category', '')
+        )
+        
+        count += 1
+        if count >= limit:
+            break
 
 @app.route('/api/search-jobs', methods=['GET'])
 def search_jobs():
     try:
         # Get query parameters
-        query = request.args.get('q', '')
-        location = request.args.get('location', 'all')
-        job_type = request.args.get('type', 'all')
-        experience_level = request.args.get('experience', 'all')
-        limit = int(request.args.get('limit', 50))
+        params = SearchQuery.from_args(request.args)
+        query = params.q
+        location = params.location
+        job_type = params.type
+        experience_level = params.experience
+        limit = params.limit
         
         logger.info(f"Searching jobs with query: {query}, location: {location}, type: {job_type}")
         
-        # Get jobs from database with filters
-        if location != 'all' or job_type != 'all' or experience_level != 'all':
+        streaming = wants_ndjson()
+        
+        # Get jobs from database with filters; text search runs on Appwrite's fulltext indexes
+        if query:
+            jobs_response = appwrite_client.get_jobs_by_filters(
+                location=location if location != 'all' else None,
+                job_type=job_type if job_type != 'all' else None,
+                experience_level=experience_level if experience_level != 'all' else None,
+                query=query,
+                limit=limit * 2
+            )
+        elif location != 'all' or job_type != 'all' or experience_level != 'all':
             jobs_response = appwrite_client.get_jobs_by_filters(
                 location=location if location != 'all' else None,
                 job_type=job_type if job_type != 'all' else None,
@@ -301,60 +630,43 @@ def search_jobs():
             jobs_response = appwrite_client.get_jobs(limit=limit * 2)
         
         if not jobs_response or not jobs_response.get('documents'):
-            return jsonify({
+            if streaming:
+                return ndjson([])
+            return ojson({
                 'success': False,
                 'message': 'No jobs found',
                 'jobs': []
             })
         
+        # Versioned by the job list this search actually read
+        etag = jobs_etag(jobs_response.get('_version'), 'search', streaming, sorted(request.args.items(multi=True)))
+        cached_response = not_modified(etag, vary=('Accept',))
+        if cached_response:
+            return cached_response
+        
         jobs = jobs_response['documents']
-        filtered_jobs = []
+        if streaming:
+            # One job per line, formatted as it is written out
+            response = with_etag(ndjson(search_results(jobs, limit)), etag)
+            response.vary.add('Accept')
+            return response
         
-        for job in jobs:
-            if not job.get('jobId') and not job.get('$id'):
-                continue
-            if not job.get('jobRole'):
-                continue
-            
-            # Text search in job role, company name, and description
-            if query:
-                job_text = f"{job.get('jobRole', '')} {job.get('companyName', '')} {job.get('description', '')}".lower()
-                if query.lower() not in job_text:
-                    continue
-            
-            # Format job for response
-            formatted_job = {
-                'id': job.get('jobId') or job.get('$id', ''),
-                'title': job.get('jobRole', ''),
-                'company': job.get('companyName', ''),
-                'location': job.get('location', ''),
-                'description': job.get('description', ''),
-                'type': job.get('jobType', ''),
-                'experienceLevel': job.get('experienceLevel', ''),
-                'skills': job.get('skills', []),
-                'salary': job.get('stipend', 'Salary not specified'),
-                'apply_link': job.get('applyLink', '#'),
-                'posted': 'Recently',
-                'logo': f"https://logo.clearbit.com/{job.get('companyName', '').replace(' ', '').lower()}.com",
-                'source': 'Gigrithm',
-                'category': job.get('category', '')
-            }
-            
-            filtered_jobs.append(formatted_job)
-            
-            if len(filtered_jobs) >= limit:
-                break
+        filtered_jobs = list(search_results(jobs, limit))
         
-        return jsonify({
+        response = with_etag(ojson({
             'success': True,
             'jobs': filtered_jobs,
             'total': len(filtered_jobs),
             'query': query
-        })
+        }), etag)
+        response.vary.add('Accept')
+        return response
         
+    except InvalidRequest as e:
+        return bad_request(e, jobs=[])
     except Exception as e:
         logger.error(f"Error in search_jobs: {str(e)}")
-        return jsonify({'success': False, 'message': str(e), 'jobs': []}), 500
+        return ojson({'success': False, 'message': str(e), 'jobs': []}, 500)
 
 @app.route('/api/user-activity-insights/<user_id>', methods=['GET'])
 def get_user_activity_insights(user_id):
@@ -362,13 +674,13 @@ def get_user_activity_insights(user_id):
         insights = recommendation_engine.get_user_activity_insights(user_id)
         
         if insights:
-            return jsonify({
+            return ojson({
                 'success': True,
                 'insights': insights,
                 'userId': user_id
             })
         else:
-            return jsonify({
+            return ojson({
                 'success': True,
                 'insights': None,
                 'message': 'No activity data found for user',
@@ -377,38 +689,27 @@ def get_user_activity_insights(user_id):
             
     except Exception as e:
         logger.error(f"Error in get_user_activity_insights: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojson({'success': False, 'message': str(e)}, 500)
 
 @app.route('/api/track-activity', methods=['POST'])
 def track_user_activity():
     try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        job_id = data.get('job_id')
-        
-        if not user_id or not job_id:
-            return jsonify({
-                'success': False,
-                'message': 'user_id and job_id are required'
-            }), 400
+        params = TrackActivityRequest.from_json(request.get_json(silent=True))
         
-        # Update user activity
-        result = appwrite_client.update_user_activity(user_id, job_id)
+        # Queue the update; the client doesn't need to wait for the Appwrite write
+        write = activity_writer.submit(appwrite_client.update_user_activity, params.user_id, params.job_id)
+        write.add_done_callback(partial(log_failed_activity_write, params.user_id, params.job_id))
         
-        if result:
-            return jsonify({
-                'success': True,
-                'message': 'Activity tracked successfully'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to track activity'
-            }), 500
+        return ojson({
+            'success': True,
+            'message': 'Activity queued for tracking'
+        }, 202)
             
+    except InvalidRequest as e:
+        return bad_request(e)
     except Exception as e:
         logger.error(f"Error in track_user_activity: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojson({'success': False, 'message': str(e)}, 500)
 
 @app.route('/api/debug/user-activity/<user_id>', methods=['GET'])
 def debug_user_activity(user_id):
@@ -426,7 +727,7 @@ def debug_user_activity(user_id):
         # Get user preferences
         user_preferences = recommendation_engine.analyze_user_preferences_from_activity(recent_jobs)
         
-        return jsonify({
+        return ojson({
             'success': True,
             'debug_info': {
                 'activity_data': activity_data,
@@ -445,7 +746,7 @@ def debug_user_activity(user_id):
         
     except Exception as e:
         logger.error(f"Error in debug_user_activity: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        return ojson({'success': False, 'message': str(e)}, 500)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -1,13 +1,77 @@
 import os
+import appwrite.client
 from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.query import Query
 from appwrite.exception import AppwriteException
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+import hashlib
 import json
+import requests
+import threading
+import time
 
 load_dotenv()
 
+# Number of recent job clicks kept per user
+MAX_RECENT_ACTIVITIES = 10
+
+# Job attributes the API actually reads; list queries fetch only these
+JOB_LIST_ATTRIBUTES = [
+    '$id', 'jobId', 'jobRole', 'companyName', 'description', 'location',
+    'jobType', 'experienceLevel', 'skills', 'applyLink', 'stipend', 'category', '$updatedAt'
+]
+
+# Per-click attributes of activity documents written before recent_activities existed
+LEGACY_ACTIVITY_FIELDS = ('recent_activity',) + tuple(
+    f'recent_activity_{i}' for i in range(2, MAX_RECENT_ACTIVITIES + 1)
+)
+
+# Marks a cache miss where None is a valid cached value
+_MISSING = object()
+
+# Job attributes covered by fulltext indexes for /api/search-jobs
+SEARCH_ATTRIBUTES = ('jobRole', 'companyName', 'description')
+
+class _PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to every request"""
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+    
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+def _create_http_session():
+    """Shared keep-alive session so Appwrite calls reuse TCP/TLS connections"""
+    session = requests.Session()
+    session.headers['Connection'] = 'keep-alive'
+    # Request threads plus the fetch pools can all be talking to Appwrite at
+    # once; connections beyond pool_maxsize are opened and then thrown away
+    adapter = _PooledHTTPAdapter(
+        timeout=float(os.getenv('APPWRITE_TIMEOUT', 10)),
+        pool_connections=4,
+        pool_maxsize=int(os.getenv('APPWRITE_POOL_MAXSIZE', 32))
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# The appwrite SDK sends every call through the module-level requests.request,
+# which opens a fresh connection (and TLS handshake) each time. Point it at a
+# pooled session instead; Session.request takes the same arguments.
+appwrite.client.requests = _create_http_session()
+
+def jobs_version(documents):
+    """Digest of a job list's ids and update times, the same in every worker process and across restarts"""
+    digest = hashlib.blake2b(digest_size=16)
+    for doc in documents:
+        digest.update(f"{doc.get('$id')}\0{doc.get('$updatedAt')}\0".encode())
+    return digest.hexdigest()
+
 class AppwriteClient:
     def __init__(self):
         self.client = Client()
@@ -20,6 +84,20 @@ class AppwriteClient:
         self.jobs_collection_id = os.getenv('JOBS_COLLECTION_ID')
         self.users_collection_id = os.getenv('USERS_COLLECTION_ID')
         self.user_activity_collection_id = os.getenv('USER_ACTIVITY_COLLECTION_ID', 'user_activity')
+        
+        # Job listings change on the order of minutes, so list responses are
+        # cached per query set instead of refetched on every request
+        self._jobs_cache = TTLCache(maxsize=32, ttl=int(os.getenv('JOBS_CACHE_TTL', 60)))
+        self._jobs_cache_lock = threading.Lock()
+        
+        # Recent activity (and the jobs it points at) is read by both the
+        # recommendation and insights paths, often back to back for one user
+        self._activity_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('ACTIVITY_CACHE_TTL', 30)))
+        self._jobs_by_ids_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('JOBS_CACHE_TTL', 60)))
+        self._activity_cache_lock = threading.Lock()
+        
+        # Runs independent Appwrite requests concurrently
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='appwrite')
     
     def get_user(self, user_id):
         try:
@@ -32,31 +110,70 @@ class AppwriteClient:
             print(f"Error fetching user: {e}")
             return None
     
-    def get_job(self, job_id):
-        """Get a specific job by job ID"""
-        try:
-            return self.databases.get_document(
-                database_id=self.database_id,
-                collection_id=self.jobs_collection_id,
-                document_id=job_id
-            )
-        except Exception as e:
-            print(f"Error fetching job {job_id}: {e}")
-            return None
+    def _list_jobs_cached(self, queries):
+        """List job documents, serving repeated identical queries from the TTL cache"""
+        cache_key = tuple(queries)
+        with self._jobs_cache_lock:
+            cached = self._jobs_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        return self._fetch_jobs(queries)
+    
+    def _fetch_jobs(self, queries, on_change=None):
+        """List job documents from Appwrite and store the response in the TTL cache
+
+        on_change(documents) runs on a changed list before it is published to the cache.
+        """
+        result = self.databases.list_documents(
+            database_id=self.database_id,
+            collection_id=self.jobs_collection_id,
+            queries=queries
+        )
+        # Tag each fetch with its content, so callers can tell when a cached list changed
+        result['_version'] = jobs_version(result['documents'])
+        cache_key = tuple(queries)
+        with self._jobs_cache_lock:
+            cached = self._jobs_cache.get(cache_key)
+        if cached is not None and cached['_version'] == result['_version']:
+            # Unchanged: keep the same list object (and whatever was built for it)
+            result = cached
+        elif on_change:
+            on_change(result['documents'])
+        with self._jobs_cache_lock:
+            self._jobs_cache[cache_key] = result
+        return result
+    
+    def start_jobs_refresher(self, interval, limit=500, on_refresh=None):
+        """Refetch the jobs catalog every interval seconds in a daemon thread, so requests always find it cached
+
+        on_refresh(documents) runs whenever the catalog changed, before requests can see the new list.
+        """
+        def refresh_loop():
+            while True:
+                try:
+                    self._fetch_jobs([Query.limit(limit), Query.select(JOB_LIST_ATTRIBUTES)], on_change=on_refresh)
+                except Exception as e:
+                    print(f"Error refreshing jobs: {e}")
+                time.sleep(interval)
+        
+        refresher = threading.Thread(target=refresh_loop, name='jobs-refresher', daemon=True)
+        refresher.start()
+        return refresher
     
     def get_jobs(self, limit=100):
         try:
-            return self.databases.list_documents(
-                database_id=self.database_id,
-                collection_id=self.jobs_collection_id,
-                queries=[Query.limit(limit)]
-            )
+            return self._list_jobs_cached([Query.limit(limit), Query.select(JOB_LIST_ATTRIBUTES)])
         except Exception as e:
             print(f"Error fetching jobs: {e}")
             return None
     
-    def get_jobs_by_filters(self, location=None, job_type=None, experience_level=None):
-        queries = [Query.limit(500)]  # Add default limit
+    def get_jobs_snapshot_version(self, limit=500):
+        """Version of the cached jobs list; changes whenever its jobs do"""
+        jobs_response = self.get_jobs(limit=limit)
+        return jobs_response.get('_version') if jobs_response else None
+    
+    def get_jobs_by_filters(self, location=None, job_type=None, experience_level=None, query=None, limit=500):
+        queries = [Query.limit(limit), Query.select(JOB_LIST_ATTRIBUTES)]
         
         if location and location != 'all':
             queries.append(Query.equal('location', location))
@@ -65,18 +182,33 @@ class AppwriteClient:
         if experience_level and experience_level != 'all':
             queries.append(Query.equal('experienceLevel', experience_level))
         
+        # The SDK doesn't escape quotes or backslashes inside query values, and
+        # either one breaks the encoded query, so search on the words around them
+        query = (query or '').replace('\\', ' ').replace('"', ' ').strip()
+        
         try:
-            return self.databases.list_documents(
-                database_id=self.database_id,
-                collection_id=self.jobs_collection_id,
-                queries=queries
+            if not query:
+                return self._list_jobs_cached(queries)
+            
+            # appwrite 4.1.0 has no Query.or, so run one fulltext search per
+            # attribute concurrently and merge the matches in attribute order.
+            responses = self._executor.map(
+                lambda attribute: self._list_jobs_cached(queries + [Query.search(attribute, query)]),
+                SEARCH_ATTRIBUTES
             )
+            documents = {}
+            for response in responses:
+                for doc in response['documents']:
+                    documents.setdefault(doc['$id'], doc)
+            
+            matches = list(documents.values())[:limit]
+            return {'total': len(matches), 'documents': matches, '_version': jobs_version(matches)}
         except Exception as e:
             print(f"Error fetching filtered jobs: {e}")
             return None
     
-    def get_user_activity(self, user_id):
-        """Get user activity record"""
+    def _fetch_user_activity(self, user_id):
+        """Activity document straight from Appwrite, or None if the user has none"""
         try:
             return self.databases.get_document(
                 database_id=self.database_id,
@@ -86,90 +218,124 @@ class AppwriteClient:
         except AppwriteException as e:
             if e.code == 404:  # Document not found
                 return None
-            print(f"Error fetching user activity: {e}")
-            return None
+            raise
+    
+    def get_user_activity(self, user_id):
+        """Get user activity record"""
+        with self._activity_cache_lock:
+            cached = self._activity_cache.get(user_id, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        try:
+            activity_data = self._fetch_user_activity(user_id)
         except Exception as e:
             print(f"Error fetching user activity: {e}")
             return None
+        with self._activity_cache_lock:
+            self._activity_cache[user_id] = activity_data
+        return activity_data
+    
+    @staticmethod
+    def parse_recent_activities(activity_data):
+        """Return the job ids in an activity document, most recent first"""
+        if not activity_data:
+            return []
+        
+        recent_activities = activity_data.get('recent_activities')
+        if recent_activities:
+            try:
+                job_ids = json.loads(recent_activities)
+            except ValueError as e:
+                print(f"Error parsing recent activities: {e}")
+                return []
+            if not isinstance(job_ids, list):
+                return []
+        else:
+            # Documents written before the recent_activities attribute existed
+            # keep their clicks in recent_activity .. recent_activity_10
+            job_ids = [activity_data.get(field, '0') for field in LEGACY_ACTIVITY_FIELDS]
+        
+        # Skip anything that isn't a job id string instead of failing the whole history
+        job_ids = (job_id.strip() for job_id in job_ids if isinstance(job_id, str))
+        return [job_id for job_id in job_ids if job_id and job_id != '0']
     
     def update_user_activity(self, user_id, job_id):
         """Update user activity with new job click, maintaining only last 10 activities"""
         try:
-            # Get existing activity
-            existing_activity = self.get_user_activity(user_id)
-            
-            # Prepare recent activities list
-            recent_activities = []
-            
-            if existing_activity:
-                # Extract existing activities
-                for i in range(1, 11):  # recent_activity to recent_activity_10
-                    activity_key = f'recent_activity_{i}' if i > 1 else 'recent_activity'
-                    activity_value = existing_activity.get(activity_key, '0')
-                    if activity_value and activity_value != '0':
-                        recent_activities.append(activity_value)
-            
-            # Add new job_id at the beginning
-            recent_activities.insert(0, job_id)
+            # Get existing activity, bypassing the cache: other workers may
+            # have written since, and this write replaces the whole list
+            existing_activity = self._fetch_user_activity(user_id)
             
-            # Keep only last 10 activities
-            recent_activities = recent_activities[:10]
+            # Move the clicked job to the front and keep only the last 10
+            recent_activities = self.parse_recent_activities(existing_activity)
+            recent_activities = [job_id] + [activity for activity in recent_activities if activity != job_id]
+            recent_activities = recent_activities[:MAX_RECENT_ACTIVITIES]
             
-            # Prepare update data
-            update_data = {'userId': user_id}
+            update_data = {
+                'userId': user_id,
+                'recent_activities': json.dumps(recent_activities)
+            }
             
-            # Fill the recent_activity fields
-            for i in range(10):
-                activity_key = f'recent_activity_{i+1}' if i > 0 else 'recent_activity'
-                if i < len(recent_activities):
-                    update_data[activity_key] = recent_activities[i]
-                else:
-                    update_data[activity_key] = '0'
-            
-            if existing_activity:
-                # Update existing document
-                return self.databases.update_document(
-                    database_id=self.database_id,
-                    collection_id=self.user_activity_collection_id,
-                    document_id=user_id,
-                    data=update_data
-                )
-            else:
-                # Create new document
-                return self.databases.create_document(
-                    database_id=self.database_id,
-                    collection_id=self.user_activity_collection_id,
-                    document_id=user_id,
-                    data=update_data
-                )
+            activity_data = self._upsert_user_activity(user_id, update_data, exists=bool(existing_activity))
+            with self._activity_cache_lock:
+                self._activity_cache[user_id] = activity_data
+            return activity_data
                 
         except Exception as e:
             print(f"Error updating user activity: {e}")
             return None
     
-    def get_user_recent_activities_with_jobs(self, user_id):
-        """Get user's recent activities with full job data"""
+    def _upsert_user_activity(self, user_id, data, exists):
+        """Create or update an activity document, tolerating a concurrent create/delete"""
+        # appwrite 4.1.0 has no upsert_document, so emulate it: try the
+        # operation the earlier read suggests, then the other one
+        operations = [self.databases.update_document, self.databases.create_document]
+        if not exists:
+            operations.reverse()
+        
         try:
-            activity_data = self.get_user_activity(user_id)
-            if not activity_data:
-                return []
-            
-            recent_jobs = []
-            
-            # Get job data for each recent activity
-            for i in range(1, 11):  # recent_activity to recent_activity_10
-                activity_key = f'recent_activity_{i}' if i > 1 else 'recent_activity'
-                job_id = activity_data.get(activity_key, '0')
-                
-                if job_id and job_id != '0':
-                    job_data = self.get_job(job_id)
-                    if job_data:
-                        recent_jobs.append(job_data)
-            
-            return recent_jobs
-            
+            return operations[0](
+                database_id=self.database_id,
+                collection_id=self.user_activity_collection_id,
+                document_id=user_id,
+                data=data
+            )
+        except AppwriteException as e:
+            if e.code not in (404, 409):  # Document missing / already exists
+                raise
+            return operations[1](
+                database_id=self.database_id,
+                collection_id=self.user_activity_collection_id,
+                document_id=user_id,
+                data=data
+            )
+    
+    def get_jobs_by_ids(self, job_ids):
+        """Get several jobs in one request, returned in the order of job_ids"""
+        if not job_ids:
+            return []
+        cache_key = tuple(job_ids)
+        with self._activity_cache_lock:
+            cached = self._jobs_by_ids_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            result = self.databases.list_documents(
+                database_id=self.database_id,
+                collection_id=self.jobs_collection_id,
+                queries=[
+                    Query.equal('$id', list(job_ids)),
+                    Query.limit(len(job_ids)),
+                    Query.select(JOB_LIST_ATTRIBUTES)
+                ]
+            )
+            jobs_by_id = {doc['$id']: doc for doc in result['documents']}
+            jobs = [jobs_by_id[job_id] for job_id in job_ids if job_id in jobs_by_id]
+            with self._activity_cache_lock:
+                self._jobs_by_ids_cache[cache_key] = jobs
+            return jobs
         except Exception as e:
-            print(f"Error fetching user recent activities with jobs: {e}")
+            print(f"Error fetching jobs by ids: {e}")
             return []
     
     def test_connection(self):
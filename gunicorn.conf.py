@@ -0,0 +1,14 @@
+import os
+
+# Every route spends most of its time waiting on Appwrite HTTPS round trips,
+# so run threaded workers: a thread blocked on Appwrite no longer holds up the
+# whole worker process. GUNICORN_WORKER_CLASS=gevent switches to greenlets
+# instead; gunicorn's gevent worker monkey-patches sockets before loading the
+# app, so the requests-based Appwrite SDK yields on I/O without code changes.
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
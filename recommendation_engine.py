@@ -1,28 +1,98 @@
-import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import MultiLabelBinarizer
 import re
-from typing import List, Dict, Any
+from typing import List, Dict
+from functools import lru_cache
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+import hashlib
+import joblib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# User profile fields that scoring reads
+PROFILE_FIELDS = ('skills', 'location', 'experienceLevel', 'education')
+
+# Job fields tallied from recent activity: (field, preference key, how many kept)
+PREFERENCE_FIELDS = (
+    ('companyName', 'preferred_companies', 5),
+    ('jobType', 'preferred_job_types', 3),
+    ('location', 'preferred_locations', 3),
+    ('category', 'preferred_categories', 3)
+)
+
+# When set, the fitted TF-IDF for the current job texts is kept on disk so
+# restarted workers can skip the refit
+TFIDF_CACHE_DIR = os.getenv('TFIDF_CACHE_DIR')
+
+# Jobs lists whose index is kept: the current catalog snapshot, and the one it
+# replaced while requests already scoring it finish
+JOB_INDEX_SLOTS = 2
+
+EXPERIENCE_LEVELS = {
+    'entry': 1, 'junior': 1, 'fresher': 1,
+    'mid': 2, 'intermediate': 2, 'senior': 3,
+    'lead': 4, 'principal': 5, 'director': 6
+}
+
+# Every level mentioned anywhere in a string (the lookahead also catches
+# overlapping mentions) in one scan; the first level in EXPERIENCE_LEVELS wins
+_EXPERIENCE_PATTERN = re.compile('(?=(' + '|'.join(map(re.escape, EXPERIENCE_LEVELS)) + '))')
+_EXPERIENCE_PRIORITY = {level: priority for priority, level in enumerate(EXPERIENCE_LEVELS)}
+
+@lru_cache(maxsize=1024)
+def experience_rank(experience):
+    """Numeric rank of a lowercased free-text experience level (defaults to entry)"""
+    levels = _EXPERIENCE_PATTERN.findall(experience)
+    if not levels:
+        return 1
+    return EXPERIENCE_LEVELS[min(levels, key=_EXPERIENCE_PRIORITY.__getitem__)]
 
 class JobRecommendationEngine:
     def __init__(self, appwrite_client):
         self.client = appwrite_client
-        self.tfidf_vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-        self.mlb_skills = MultiLabelBinarizer()
+        # 1 + log(tf) suits short postings where a repeated word shouldn't dominate;
+        # words in a single posting or in nearly all of them don't help rank the
+        # catalog; float32 halves the matrix that every request multiplies against
+        self.tfidf_vectorizer = TfidfVectorizer(
+            stop_words='english', max_features=1000, norm='l2', sublinear_tf=True, dtype=np.float32,
+            min_df=2, max_df=0.95
+        )
+        self.mlb_skills = MultiLabelBinarizer(sparse_output=True)
+        self._job_indexes = []
+        self._job_index_lock = threading.Lock()
+        # Runs the independent Appwrite fetches of a recommendation request side by side
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='engine-fetch')
+        # Preferences derived from a given list of recent jobs, shared by the
+        # recommendation and insights paths
+        self._preferences_cache = TTLCache(maxsize=1024, ttl=int(os.getenv('PREFERENCES_CACHE_TTL', 120)))
+        self._preferences_cache_lock = threading.Lock()
         
     def preprocess_skills(self, skills):
         """Convert skills to a standardized format"""
         if isinstance(skills, str):
             skills = [s.strip().lower() for s in skills.split(',')]
         elif isinstance(skills, list):
-            skills = [s.strip().lower() for s in skills if s]
+            skills = [s.strip().lower() for s in skills if isinstance(s, str) and s]
         else:
             skills = []
         return skills
     
+    def job_skill_set(self, job):
+        """Preprocessed skills of a job, computed once and kept on the (cached) job document"""
+        skills = job.get('_skills_set')
+        if skills is None:
+            skills = frozenset(self.preprocess_skills(job.get('skills', [])))
+            job['_skills_set'] = skills
+        return skills
+    
     def extract_features_from_job(self, job):
         """Extract and combine features from job data"""
         description = job.get('description', '')
@@ -34,62 +104,9 @@ class JobRecommendationEngine:
         text_features = f"{job_role} {description} {company} {category}"
         return text_features.lower()
     
-    def calculate_skill_similarity(self, user_skills, job_skills):
-        """Calculate similarity between user skills and job requirements"""
-        user_skills_set = set(self.preprocess_skills(user_skills))
-        job_skills_set = set(self.preprocess_skills(job_skills))
-        
-        if not user_skills_set or not job_skills_set:
-            return 0.0
-        
-        intersection = user_skills_set.intersection(job_skills_set)
-        union = user_skills_set.union(job_skills_set)
-        
-        return len(intersection) / len(union) if union else 0.0
-    
-    def calculate_location_match(self, user_location, job_location):
-        """Calculate location compatibility"""
-        if not user_location or not job_location:
-            return 0.5  # neutral score
-        
-        user_location = user_location.lower().strip()
-        job_location = job_location.lower().strip()
-        
-        if user_location == job_location:
-            return 1.0
-        elif 'remote' in job_location or 'anywhere' in job_location:
-            return 0.9
-        elif any(word in job_location for word in user_location.split()):
-            return 0.7
-        else:
-            return 0.3
-    
-    def calculate_experience_match(self, user_experience, job_experience):
-        """Calculate experience level compatibility"""
-        experience_levels = {
-            'entry': 1, 'junior': 1, 'fresher': 1,
-            'mid': 2, 'intermediate': 2, 'senior': 3,
-            'lead': 4, 'principal': 5, 'director': 6
-        }
-        
-        user_level = 1
-        job_level = 1
-        
-        if user_experience:
-            for level, value in experience_levels.items():
-                if level in user_experience.lower():
-                    user_level = value
-                    break
-        
-        if job_experience:
-            for level, value in experience_levels.items():
-                if level in job_experience.lower():
-                    job_level = value
-                    break
-        
-        # Calculate compatibility score
-        diff = abs(user_level - job_level)
-        return max(0, 1 - (diff * 0.2))
+    def get_experience_level(self, experience):
+        """Map a free-text experience level to its numeric rank (defaults to entry)"""
+        return experience_rank(experience.lower()) if experience else 1
     
     def get_user_activity_job_ids(self, user_id):
         """Get all valid job IDs from user activity collection"""
@@ -98,285 +115,509 @@ class JobRecommendationEngine:
             if not activity_data:
                 return []
             
-            valid_job_ids = []
-            
-            # Extract job IDs from all recent_activity fields (1-10)
-            for i in range(1, 11):
-                field_name = f'recent_activity_{i}' if i > 1 else 'recent_activity'
-                job_id = activity_data.get(field_name, '0')
-                
-                # Only include valid job IDs (not '0' or empty)
-                if job_id and job_id != '0' and job_id.strip():
-                    valid_job_ids.append(job_id.strip())
-            
-            return valid_job_ids
+            # Only valid job IDs (not '0' or empty), most recent first
+            return self.client.parse_recent_activities(activity_data)
             
         except Exception as e:
             print(f"Error fetching user activity job IDs: {e}")
             return []
     
-    def get_jobs_from_activity(self, user_id):
-        """Get actual job data from user activity - only valid jobs"""
+    def get_recent_activity(self, user_id):
+        """Recent job IDs and the matching valid job documents, from one activity read"""
         job_ids = self.get_user_activity_job_ids(user_id)
         if not job_ids:
-            return []
+            return [], []
         
-        jobs_data = []
-        for job_id in job_ids:
-            try:
-                job_data = self.client.get_job(job_id)
-                if job_data and job_data.get('jobRole'):  # Ensure it's a valid job
-                    jobs_data.append(job_data)
-            except Exception as e:
-                print(f"Error fetching job {job_id}: {e}")
-                continue
-        
-        return jobs_data
+        # One list_documents call for all of them instead of a get_document per id
+        jobs_data = self.client.get_jobs_by_ids(job_ids)
+        return job_ids, [job for job in jobs_data if job.get('jobRole')]  # Ensure it's a valid job
+    
+    def get_jobs_from_activity(self, user_id):
+        """Get actual job data from user activity - only valid jobs"""
+        return self.get_recent_activity(user_id)[1]
     
     def analyze_user_preferences_from_activity(self, recent_jobs):
         """Analyze user preferences based on recent job clicks with weighted scoring"""
         if not recent_jobs:
             return {}
         
+        # The same recent jobs (in the same order) always give the same preferences
+        cache_key = tuple(job.get('$id') or job.get('jobId') for job in recent_jobs)
+        with self._preferences_cache_lock:
+            cached = self._preferences_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        preferences = self._analyze_user_preferences(recent_jobs)
+        with self._preferences_cache_lock:
+            self._preferences_cache[cache_key] = preferences
+        return preferences
+    
+    def _analyze_user_preferences(self, recent_jobs):
         # Weight recent activities more (first activity gets highest weight)
         weights = [1.0, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1]
         
         # Extract patterns from recent activities with weights
-        weighted_companies = {}
-        weighted_job_types = {}
-        weighted_locations = {}
-        weighted_categories = {}
-        weighted_skills = {}
+        weighted = {field: Counter() for field, _, _ in PREFERENCE_FIELDS}
+        weighted_skills = Counter()
         
         for i, job in enumerate(recent_jobs):
             weight = weights[i] if i < len(weights) else 0.1
             
-            # Company preferences
-            company = job.get('companyName', '').strip()
-            if company:
-                weighted_companies[company] = weighted_companies.get(company, 0) + weight
-            
-            # Job type preferences
-            job_type = job.get('jobType', '').strip()
-            if job_type:
-                weighted_job_types[job_type] = weighted_job_types.get(job_type, 0) + weight
-            
-            # Location preferences
-            location = job.get('location', '').strip()
-            if location:
-                weighted_locations[location] = weighted_locations.get(location, 0) + weight
-            
-            # Category preferences
-            category = job.get('category', '').strip()
-            if category:
-                weighted_categories[category] = weighted_categories.get(category, 0) + weight
+            # Company, job type, location and category preferences
+            for field, _, _ in PREFERENCE_FIELDS:
+                value = job.get(field, '').strip()
+                if value:
+                    weighted[field][value] += weight
             
             # Skills preferences
             job_skills = job.get('skills', [])
-            if isinstance(job_skills, list):
-                for skill in job_skills:
-                    if skill and skill.strip():
-                        skill_clean = skill.lower().strip()
-                        weighted_skills[skill_clean] = weighted_skills.get(skill_clean, 0) + weight
-            elif isinstance(job_skills, str):
-                for skill in job_skills.split(','):
-                    if skill and skill.strip():
-                        skill_clean = skill.lower().strip()
-                        weighted_skills[skill_clean] = weighted_skills.get(skill_clean, 0) + weight
-        
-        # Sort by weight and return top preferences
-        preferences = {
-            'preferred_companies': sorted(weighted_companies.items(), key=lambda x: x[1], reverse=True)[:5],
-            'preferred_job_types': sorted(weighted_job_types.items(), key=lambda x: x[1], reverse=True)[:3],
-            'preferred_locations': sorted(weighted_locations.items(), key=lambda x: x[1], reverse=True)[:3],
-            'preferred_categories': sorted(weighted_categories.items(), key=lambda x: x[1], reverse=True)[:3],
-            'trending_skills': sorted(weighted_skills.items(), key=lambda x: x[1], reverse=True)[:10]
-        }
+            if isinstance(job_skills, str):
+                job_skills = job_skills.split(',')
+            elif not isinstance(job_skills, list):
+                job_skills = []
+            for skill in job_skills:
+                if skill and skill.strip():
+                    weighted_skills[skill.lower().strip()] += weight
+        
+        # Top preferences by weight; most_common keeps first-seen order on ties
+        preferences = {key: weighted[field].most_common(n) for field, key, n in PREFERENCE_FIELDS}
+        preferences['trending_skills'] = weighted_skills.most_common(10)
         
         return preferences
     
-    def calculate_activity_based_score(self, job, user_preferences, recent_job_ids):
-        """Enhanced activity-based scoring with decay and similarity"""
-        if not user_preferences:
-            return 0.0
-        
-        score = 0.0
-        
-        # Avoid recommending recently clicked jobs
-        job_id = job.get('$id') or job.get('jobId')
-        if job_id in recent_job_ids:
-            return -1.0  # Negative score to filter out
-        
-        # Company preference with weighted scoring
-        job_company = job.get('companyName', '').strip().lower()
-        preferred_companies = [(comp.lower(), weight) for comp, weight in user_preferences.get('preferred_companies', [])]
-        for pref_company, weight in preferred_companies:
+    def build_preference_tables(self, user_preferences):
+        """Lowercased preference lookups (with weights capped at 1.0), built once per user"""
+        def capped(key):
+            return [(value.lower(), min(weight, 1.0)) for value, weight in user_preferences.get(key, [])]
+        
+        def first_match(pairs):
+            table = {}
+            for value, weight in pairs:
+                table.setdefault(value, weight)
+            return table
+        
+        return {
+            # Companies and locations also match on substrings, so keep them in rank order
+            'companies': capped('preferred_companies'),
+            'locations': capped('preferred_locations'),
+            'job_types': first_match(capped('preferred_job_types')),
+            'categories': first_match(capped('preferred_categories')),
+            'trending_skills': dict(user_preferences.get('trending_skills', []))
+        }
+    
+    def company_preference_score(self, job_company, tables):
+        """Activity score contribution of a (lowercased) company; the first preference that matches wins"""
+        for pref_company, weight in tables['companies']:
             if job_company == pref_company:
-                score += 0.25 * min(weight, 1.0)  # Cap weight at 1.0
-                break
+                return 0.25 * weight
             elif pref_company in job_company or job_company in pref_company:
-                score += 0.15 * min(weight, 1.0)  # Partial match
-                break
-        
-        # Job type preference
-        job_type = job.get('jobType', '').strip().lower()
-        preferred_types = [(jtype.lower(), weight) for jtype, weight in user_preferences.get('preferred_job_types', [])]
-        for pref_type, weight in preferred_types:
-            if job_type == pref_type:
-                score += 0.2 * min(weight, 1.0)
-                break
-        
-        # Location preference
-        job_location = job.get('location', '').strip().lower()
-        preferred_locations = [(loc.lower(), weight) for loc, weight in user_preferences.get('preferred_locations', [])]
-        for pref_location, weight in preferred_locations:
+                return 0.15 * weight  # Partial match
+        return 0.0
+    
+    def location_preference_score(self, job_location, tables):
+        """Activity score contribution of a (lowercased) location; the first preference that matches wins"""
+        for pref_location, weight in tables['locations']:
             if pref_location in job_location or job_location in pref_location:
-                score += 0.15 * min(weight, 1.0)
-                break
-        
-        # Category preference
-        job_category = job.get('category', '').strip().lower()
-        preferred_categories = [(cat.lower(), weight) for cat, weight in user_preferences.get('preferred_categories', [])]
-        for pref_category, weight in preferred_categories:
-            if job_category == pref_category:
-                score += 0.15 * min(weight, 1.0)
-                break
-        
-        # Skills alignment with trending interests
-        job_skills = set(self.preprocess_skills(job.get('skills', [])))
-        trending_skills = dict(user_preferences.get('trending_skills', []))
-        
-        skill_score = 0.0
-        for job_skill in job_skills:
-            if job_skill in trending_skills:
-                skill_score += trending_skills[job_skill]
-        
-        # Normalize skill score
-        if job_skills:
-            skill_score = min(skill_score / len(job_skills), 1.0)
-            score += 0.25 * skill_score
-        
-        return min(score, 1.0)  # Cap at 1.0
+                return 0.15 * weight
+        return 0.0
+    
+    def encode_field(self, jobs, field):
+        """Distinct lowercased values of a text field and each job's code into them"""
+        values, codes = np.unique(
+            np.array([(job.get(field) or '').strip().lower() for job in jobs], dtype=str),
+            return_inverse=True
+        )
+        return values, codes.astype(np.int32)
     
-    def calculate_content_similarity(self, user_profile, job):
-        """Calculate content-based similarity between user profile and job"""
+    def build_job_index(self, jobs):
+        """Pre-index jobs as parallel arrays (struct-of-arrays) for batch scoring"""
+        skill_binarizer = clone(self.mlb_skills)
+        skill_matrix = skill_binarizer.fit_transform(
+            [self.job_skill_set(job) for job in jobs]
+        ).tocsr()
+        
+        raw_locations = [job.get('location') or '' for job in jobs]
+        locations, location_codes = np.unique(
+            np.array([location.lower().strip() for location in raw_locations], dtype=str),
+            return_inverse=True
+        )
+        # TF-IDF is fitted once per jobs snapshot; requests only transform the user text
+        texts = [self.extract_features_from_job(job) for job in jobs]
+        tfidf_vectorizer, tfidf_matrix = self.fit_tfidf(texts)
+        
+        companies, company_codes = self.encode_field(jobs, 'companyName')
+        job_type_values, job_type_codes = self.encode_field(jobs, 'jobType')
+        categories, category_codes = self.encode_field(jobs, 'category')
+        
+        return {
+            'jobs': jobs,
+            'ids': np.array([job.get('jobId') or job.get('$id') for job in jobs], dtype=object),
+            'document_ids': np.array([job.get('$id') or job.get('jobId') for job in jobs], dtype=object),
+            'job_types': np.array([(job.get('jobType') or '').lower() for job in jobs], dtype=str),
+            # Exact values, for the jobType/category recommendation filters
+            'job_type_labels': np.array([job.get('jobType') for job in jobs], dtype=object),
+            'category_labels': np.array([job.get('category') for job in jobs], dtype=object),
+            'skill_columns': {skill: column for column, skill in enumerate(skill_binarizer.classes_)},
+            'skill_matrix': skill_matrix,
+            'skill_counts': np.asarray(skill_matrix.sum(axis=1)).ravel(),
+            'locations': locations,
+            'location_codes': location_codes.astype(np.int32),
+            'location_is_remote': (np.char.find(locations, 'remote') >= 0) | (np.char.find(locations, 'anywhere') >= 0),
+            'has_location': np.array([bool(location) for location in raw_locations], dtype=bool),
+            'companies': companies,
+            'company_codes': company_codes,
+            'job_type_values': job_type_values,
+            'job_type_codes': job_type_codes,
+            'categories': categories,
+            'category_codes': category_codes,
+            'experience_levels': np.array(
+                [self.get_experience_level(job.get('experienceLevel', '')) for job in jobs], dtype=np.int32
+            ),
+            'tfidf_vectorizer': tfidf_vectorizer,
+            'tfidf_matrix': tfidf_matrix
+        }
+    
+    def fit_tfidf(self, texts):
+        """Fitted vectorizer and TF-IDF matrix for job texts, reusing the TFIDF_CACHE_DIR copy if it matches"""
+        cache_path = None
+        if TFIDF_CACHE_DIR:
+            key = repr(sorted(self.tfidf_vectorizer.get_params().items())) + '\0' + '\0'.join(texts)
+            digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+            cache_path = os.path.join(TFIDF_CACHE_DIR, f'tfidf-{digest}.joblib')
+            try:
+                return joblib.load(cache_path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error loading cached TF-IDF: {e}")
+        
+        vectorizer = clone(self.tfidf_vectorizer)
         try:
-            # Build user profile text
-            user_skills = user_profile.get('skills', [])
-            user_education = user_profile.get('education', '')
-            user_experience = user_profile.get('experienceLevel', '')
-            
-            user_text = f"{' '.join(user_skills)} {user_education} {user_experience}".strip()
-            
-            # Build job text
-            job_text = self.extract_features_from_job(job)
-            
-            if not user_text or not job_text:
-                return 0.0
-            
-            # Calculate TF-IDF similarity
-            corpus = [user_text.lower(), job_text]
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-            
-            return similarity
-            
-        except Exception as e:
-            print(f"Error calculating content similarity: {e}")
-            return 0.0
+            matrix = vectorizer.fit_transform(texts)
+        except ValueError:
+            # Too few jobs for the document frequency cutoffs; fit without them
+            vectorizer.set_params(min_df=1, max_df=1.0)
+            try:
+                matrix = vectorizer.fit_transform(texts)
+            except ValueError:  # No usable words in any job
+                return None, None
+        
+        if cache_path:
+            try:
+                # Write then rename, so other workers never load a partial file
+                os.makedirs(TFIDF_CACHE_DIR, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=TFIDF_CACHE_DIR, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as tmp_file:
+                    joblib.dump((vectorizer, matrix), tmp_file)
+                os.replace(tmp_path, cache_path)
+                
+                # Keep only the most recent fits (one per live jobs list)
+                cached = sorted(
+                    (entry for entry in os.scandir(TFIDF_CACHE_DIR)
+                     if entry.name.startswith('tfidf-') and entry.name.endswith('.joblib')),
+                    key=lambda entry: entry.stat().st_mtime, reverse=True
+                )
+                for entry in cached[JOB_INDEX_SLOTS:]:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:  # Another worker got there first
+                        pass
+            except Exception as e:
+                print(f"Error saving cached TF-IDF: {e}")
+        return vectorizer, matrix
+    
+    def _find_job_index(self, jobs):
+        for index in self._job_indexes:
+            if index['jobs'] is jobs:
+                return index
+        return None
+    
+    def get_job_index(self, jobs):
+        """Return the job index for this jobs list, rebuilding it only when the list changes"""
+        index = self._find_job_index(jobs)
+        if index is None:
+            # Single flight: concurrent requests for a new list wait for one build
+            with self._job_index_lock:
+                index = self._find_job_index(jobs)
+                if index is None:
+                    index = self.build_job_index(jobs)
+                    self._job_indexes = [index] + self._job_indexes[:JOB_INDEX_SLOTS - 1]
+        return index
     
-    def get_recommendations(self, user_id: str, num_recommendations: int = 10):
-        """Generate enhanced job recommendations using activity-based collaborative filtering"""
-        print(f"Generating recommendations for user: {user_id}")
+    def score_jobs_batch(self, user_profile, jobs, content_rows=None):
+        """Score jobs against a user profile at once; content similarity only covers content_rows when given"""
+        index = self.get_job_index(jobs)
+        num_jobs = len(jobs)
+        
+        # Skill similarity (Jaccard) as one sparse product against the skill matrix
+        user_skills = set(self.preprocess_skills(user_profile.get('skills', [])))
+        skill_scores = np.zeros(num_jobs)
+        if user_skills and num_jobs:
+            user_vector = np.zeros(len(index['skill_columns']))
+            for skill in user_skills:
+                column = index['skill_columns'].get(skill)
+                if column is not None:
+                    user_vector[column] = 1.0
+            intersection = index['skill_matrix'] @ user_vector
+            union = index['skill_counts'] + len(user_skills) - intersection
+            has_skills = index['skill_counts'] > 0
+            skill_scores[has_skills] = intersection[has_skills] / union[has_skills]
+        
+        # Location match (exact 1.0, remote 0.9, shared word 0.7, else 0.3; 0.5
+        # without a location), scored once per distinct location and gathered
+        # back out through the codes
+        user_location = user_profile.get('location') or ''
+        if user_location and num_jobs:
+            user_location = user_location.lower().strip()
+            user_words = frozenset(user_location.split())
+            locations = index['locations']
+            word_overlap = np.array([any(word in location for word in user_words) for location in locations], dtype=bool)
+            unique_scores = np.select(
+                [locations == user_location, index['location_is_remote'], word_overlap],
+                [1.0, 0.9, 0.7],
+                default=0.3
+            )
+            location_scores = np.where(index['has_location'], unique_scores[index['location_codes']], 0.5)
+        else:
+            location_scores = np.full(num_jobs, 0.5)
+        
+        # Experience match from numeric level codes
+        user_level = self.get_experience_level(user_profile.get('experienceLevel', ''))
+        experience_scores = np.maximum(0, 1 - np.abs(user_level - index['experience_levels']) * 0.2)
+        
+        # Content similarity: the user text against the index's prefitted TF-IDF rows
+        if content_rows is None:
+            content_rows = np.arange(num_jobs)
+        content_scores = self.calculate_content_similarity_batch(user_profile, jobs, content_rows)
+        
+        return {
+            'skill_score': skill_scores,
+            'location_score': location_scores,
+            'experience_score': experience_scores,
+            'content_similarity': content_scores
+        }
+    
+    def score_activity_batch(self, user_preferences, jobs):
+        """Activity preference score of every job at once, capped at 1.0 (recently clicked jobs are not excluded)"""
+        index = self.get_job_index(jobs)
+        num_jobs = len(jobs)
+        if not user_preferences or not num_jobs:
+            return np.zeros(num_jobs)
+        tables = self.build_preference_tables(user_preferences)
+        
+        # Text preferences are scored once per distinct value and gathered back out
+        def per_value(values, codes, score):
+            return np.array([score(value) for value in values])[codes]
+        
+        company_scores = per_value(
+            index['companies'], index['company_codes'],
+            lambda company: self.company_preference_score(company, tables)
+        )
+        job_type_scores = per_value(
+            index['job_type_values'], index['job_type_codes'],
+            lambda job_type: 0.2 * tables['job_types'].get(job_type, 0.0)
+        )
+        location_scores = per_value(
+            index['locations'], index['location_codes'],
+            lambda location: self.location_preference_score(location, tables)
+        )
+        category_scores = per_value(
+            index['categories'], index['category_codes'],
+            lambda category: 0.15 * tables['categories'].get(category, 0.0)
+        )
+        
+        # Skills alignment: mean trending weight over each job's skills
+        trending_vector = np.zeros(len(index['skill_columns']))
+        for skill, weight in tables['trending_skills'].items():
+            column = index['skill_columns'].get(skill)
+            if column is not None:
+                trending_vector[column] = weight
+        skill_scores = np.zeros(num_jobs)
+        has_skills = index['skill_counts'] > 0
+        skill_scores[has_skills] = 0.25 * np.minimum(
+            (index['skill_matrix'] @ trending_vector)[has_skills] / index['skill_counts'][has_skills], 1.0
+        )
+        
+        score = company_scores + job_type_scores + location_scores + category_scores + skill_scores
+        return np.minimum(score, 1.0)  # Cap at 1.0
+    
+    def calculate_content_similarity_batch(self, user_profile, jobs, rows):
+        """Content similarity of the jobs at rows to the user profile, against the index's TF-IDF matrix"""
+        index = self.get_job_index(jobs)
+        content_scores = np.zeros(len(jobs))
+        # preprocess_skills tolerates a missing or null skills field and splits comma separated strings
+        user_skills = self.preprocess_skills(user_profile.get('skills'))
+        user_text = f"{' '.join(user_skills)} {user_profile.get('education', '')} {user_profile.get('experienceLevel', '')}".strip()
+        if user_text and len(rows) and index['tfidf_vectorizer'] is not None:
+            try:
+                # TfidfVectorizer L2-normalizes every row (norm='l2'), so the
+                # cosine similarity is just the dot product
+                user_vector = index['tfidf_vectorizer'].transform([user_text.lower()])
+                content_scores[rows] = (index['tfidf_matrix'][rows] @ user_vector.T).toarray().ravel()
+            except Exception as e:
+                print(f"Error calculating batch content similarity: {e}")
+        return content_scores
+    
+    def recently_seen_mask(self, jobs, recent_job_ids):
+        """Boolean mask of the jobs the user clicked recently, checked for all jobs at once"""
+        index = self.get_job_index(jobs)
+        if not recent_job_ids:
+            return np.zeros(len(jobs), dtype=bool)
+        return np.isin(index['document_ids'], list(recent_job_ids))
+    
+    def prune_candidates(self, partial_scores, candidates, k, max_remaining):
+        """Drop candidates that can't reach the top k even if they gain max_remaining more score"""
+        if len(candidates) <= k:
+            return candidates
+        kth_best = np.partition(partial_scores[candidates], -k)[-k]
+        return candidates[partial_scores[candidates] + max_remaining >= kth_best]
+    
+    def top_k_indices(self, scores, k):
+        """Indices of the k highest scores, best first (ties keep their original order)"""
+        if k <= 0:
+            return np.zeros(0, dtype=int)
+        if k < len(scores):
+            # argpartition picks arbitrarily among scores tied with the k-th best,
+            # so take everything above it and then the earliest of the ties
+            kth_best = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = np.flatnonzero(scores > kth_best)
+            tied = np.flatnonzero(scores == kth_best)[:k - len(above)]
+            candidates = np.concatenate((above, tied))
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+    
+    def score_jobs(self, user_profile: Dict, jobs: List, top_k: int = 20, job_type: str = 'all'):
+        """Top scoring jobs for a profile without activity history, as {'job', 'score'} dicts"""
+        index = self.get_job_index(jobs)
+        
+        # Keep only valid jobs of the requested type
+        eligible = np.array([bool(job_id) for job_id in index['ids']], dtype=bool)
+        eligible &= np.array([bool(job.get('jobRole')) for job in jobs], dtype=bool)
+        if job_type != 'all':
+            eligible &= index['job_types'] == job_type.lower()
+        eligible = np.flatnonzero(eligible)
+        
+        # First pass: the cheap scores for every job, vectorized over the catalog
+        batch_scores = self.score_jobs_batch(user_profile, jobs, content_rows=[])
+        partial_scores = (
+            batch_scores['skill_score'] * 0.4 +
+            batch_scores['location_score'] * 0.2 +
+            batch_scores['experience_score'] * 0.1
+        )
+        
+        # Second pass: content similarity (weight 0.3, at most 1.0) only for
+        # jobs that could still make the top k
+        candidates = self.prune_candidates(partial_scores, eligible, top_k, 0.3)
+        content_scores = self.calculate_content_similarity_batch(user_profile, jobs, candidates)
+        final_scores = partial_scores + content_scores * 0.3
+        
+        # Pick the top k without sorting every job
+        return [
+            {'job': jobs[i], 'score': float(final_scores[i])}
+            for i in candidates[self.top_k_indices(final_scores[candidates], top_k)]
+        ]
+    
+    def get_recommendations(self, user_id: str, num_recommendations: int = 10, filters: Dict = None, user_data: Dict = None):
+        """Generate enhanced job recommendations using activity-based collaborative filtering
+
+        user_data is the user's document when the caller already fetched it.
+        """
+        logger.debug("Generating recommendations for user: %s", user_id)
+        
+        # The user, their recent activity and the jobs catalog don't depend on
+        # each other, so fetch them concurrently
+        user_future = self._executor.submit(self.client.get_user, user_id) if user_data is None else None
+        activity_future = self._executor.submit(self.get_recent_activity, user_id)
+        filters = filters or {}
+        # Filtered requests score the same cached catalog, and its prebuilt index,
+        # as unfiltered ones; the filters only mask rows
+        jobs_future = self._executor.submit(self.client.get_jobs, limit=500)
         
         # Get user data
-        user_data = self.client.get_user(user_id)
+        if user_future is not None:
+            user_data = user_future.result()
         if not user_data:
-            print(f"User {user_id} not found")
+            logger.debug("User %s not found", user_id)
             return []
         
         # Get user's recent activities from user_activity collection
-        recent_jobs = self.get_jobs_from_activity(user_id)
-        recent_job_ids = self.get_user_activity_job_ids(user_id)
+        recent_job_ids, recent_jobs = activity_future.result()
         
-        print(f"Found {len(recent_jobs)} valid recent job activities for user {user_id}")
-        print(f"Recent job IDs: {recent_job_ids}")
+        logger.debug("Found %d valid recent job activities for user %s: %s", len(recent_jobs), user_id, recent_job_ids)
         
         # Analyze user preferences from activity
         user_preferences = self.analyze_user_preferences_from_activity(recent_jobs)
         
         # Get all available jobs
-        jobs_response = self.client.get_jobs(limit=500)
+        jobs_response = jobs_future.result()
         if not jobs_response or not jobs_response['documents']:
-            print("No jobs found in database")
+            logger.debug("No jobs found in database")
             return []
         
         jobs = jobs_response['documents']
-        print(f"Processing {len(jobs)} total jobs")
-        
-        # Extract user features
-        user_skills = user_data.get('skills', [])
-        user_location = user_data.get('location', '')
-        user_experience = user_data.get('experienceLevel', '')
-        
-        # Calculate scores for each job
+        logger.debug("Processing %d total jobs", len(jobs))
+        
+        # Recently clicked jobs are never recommended again; find them all up front
+        recently_seen = self.recently_seen_mask(jobs, recent_job_ids if user_preferences else [])
+        
+        # Skip jobs without the required fields, or that were just clicked
+        is_valid = np.array([bool(job.get('jobId') and job.get('jobRole')) for job in jobs], dtype=bool)
+        # Filters are masks over the cached catalog's index: jobType and category
+        # match exactly, location is a case-insensitive substring match
+        index = self.get_job_index(jobs)
+        if filters.get('jobType'):
+            is_valid &= index['job_type_labels'] == filters['jobType']
+        if filters.get('category'):
+            is_valid &= index['category_labels'] == filters['category']
+        if filters.get('location'):
+            location_filter = filters['location'].lower()
+            is_valid &= np.array([location_filter in (job.get('location') or '').lower() for job in jobs], dtype=bool)
+        candidates = np.flatnonzero(is_valid & ~recently_seen)
+        
+        # Cheap scores first: skill, location and experience for all jobs as
+        # arrays (content similarity is left for the second pass)
+        batch_scores = self.score_jobs_batch(user_data, jobs, content_rows=[])
+        
+        # Enhanced activity-based preference score; recently clicked jobs were
+        # already dropped from the candidates above
+        activity_scores = self.score_activity_batch(user_preferences, jobs)
+        
+        # Enhanced weighted final score with activity emphasis, one weighted
+        # sum over the stacked score arrays
+        if recent_jobs:  # If user has activity history
+            content_weight = 0.2
+            # skill, location, experience, activity
+            weights = np.array([0.2, 0.1, 0.1, 0.4])
+        else:  # If no activity history, use traditional content-based approach
+            content_weight = 0.35
+            weights = np.array([0.35, 0.2, 0.1, 0.0])
+        partial_scores = weights @ np.stack([
+            batch_scores['skill_score'],
+            batch_scores['location_score'],
+            batch_scores['experience_score'],
+            activity_scores
+        ])
+        
+        # Content similarity is at most 1, so only jobs that could still make
+        # the top N with a perfect content match are scored for it
+        candidates = self.prune_candidates(partial_scores, candidates, num_recommendations, content_weight)
+        content_scores = self.calculate_content_similarity_batch(user_data, jobs, candidates)
+        final_scores = partial_scores + content_scores * content_weight
+        
+        # Only the top recommendations are ranked and built into results
         job_scores = []
-        
-        for job in jobs:
-            # Skip if job doesn't have required fields
-            if not job.get('jobId') or not job.get('jobRole'):
-                continue
-            
-            job_id = job.get('$id') or job.get('jobId')
-            
-            # Calculate individual similarity scores
-            skill_score = self.calculate_skill_similarity(
-                user_skills, job.get('skills', [])
-            )
-            
-            location_score = self.calculate_location_match(
-                user_location, job.get('location', '')
-            )
-            
-            experience_score = self.calculate_experience_match(
-                user_experience, job.get('experienceLevel', '')
-            )
-            
-            # Enhanced activity-based preference score
-            activity_score = self.calculate_activity_based_score(
-                job, user_preferences, recent_job_ids
-            )
-            
-            # Skip recently clicked jobs (negative activity score)
-            if activity_score < 0:
-                continue
-            
-            # Content-based similarity
-            content_similarity = self.calculate_content_similarity(user_data, job)
-            
-            # Enhanced weighted final score with activity emphasis
-            if recent_jobs:  # If user has activity history
-                final_score = (
-                    skill_score * 0.2 +           # Reduced individual factors
-                    content_similarity * 0.2 +    # when activity data is available
-                    location_score * 0.1 +        
-                    experience_score * 0.1 +      
-                    activity_score * 0.4          # Heavy emphasis on activity patterns
-                )
-            else:  # If no activity history, use traditional content-based approach
-                final_score = (
-                    skill_score * 0.35 +
-                    content_similarity * 0.35 +
-                    location_score * 0.2 +
-                    experience_score * 0.1
-                )
-            
+        for i in candidates[self.top_k_indices(final_scores[candidates], num_recommendations)]:
+            skill_score = float(batch_scores['skill_score'][i])
+            content_similarity = float(content_scores[i])
+            activity_score = float(activity_scores[i])
             job_scores.append({
-                'job': job,
-                'score': final_score,
+                'job': jobs[i],
+                'score': float(final_scores[i]),
                 'skill_score': skill_score,
-                'location_score': location_score,
-                'experience_score': experience_score,
+                'location_score': float(batch_scores['location_score'][i]),
+                'experience_score': float(batch_scores['experience_score'][i]),
                 'content_similarity': content_similarity,
                 'activity_score': activity_score,
                 'has_activity_data': len(recent_jobs) > 0,
@@ -385,20 +626,22 @@ class JobRecommendationEngine:
                 )
             })
         
-        # Sort by score and return top recommendations
-        job_scores.sort(key=lambda x: x['score'], reverse=True)
-        
-        # Debug information
-        if recent_jobs:
-            print(f"\nUser {user_id} activity-based preferences:")
-            print(f"Top companies: {[comp for comp, _ in user_preferences.get('preferred_companies', [])[:3]]}")
-            print(f"Top job types: {[jtype for jtype, _ in user_preferences.get('preferred_job_types', [])[:3]]}")
-            print(f"Top skills: {[skill for skill, _ in user_preferences.get('trending_skills', [])[:5]]}")
-            print(f"Recent job IDs filtered: {recent_job_ids[:5]}")
-        else:
-            print(f"No activity data found for user {user_id}, using content-based recommendations")
+        # Debug information, only built when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            if recent_jobs:
+                logger.debug(
+                    "User %s activity-based preferences: companies=%s job_types=%s skills=%s filtered=%s",
+                    user_id,
+                    [comp for comp, _ in user_preferences.get('preferred_companies', [])[:3]],
+                    [jtype for jtype, _ in user_preferences.get('preferred_job_types', [])[:3]],
+                    [skill for skill, _ in user_preferences.get('trending_skills', [])[:5]],
+                    recent_job_ids[:5]
+                )
+            else:
+                logger.debug("No activity data found for user %s, using content-based recommendations", user_id)
+            logger.debug("top_scores=%s", [(rec['job'].get('jobId'), rec['score']) for rec in job_scores])
         
-        return job_scores[:num_recommendations]
+        return job_scores
     
     def get_recommendation_reason(self, skill_score, activity_score, content_similarity, has_activity):
         """Generate human-readable recommendation reason"""
@@ -413,29 +656,7 @@ class JobRecommendationEngine:
     
     def get_filtered_recommendations(self, user_id: str, filters: Dict = None, num_recommendations: int = 10):
         """Get recommendations with additional filters"""
-        recommendations = self.get_recommendations(user_id, num_recommendations * 2)
-        
-        if not filters:
-            return recommendations[:num_recommendations]
-        
-        filtered_recommendations = []
-        for rec in recommendations:
-            job = rec['job']
-            
-            # Apply filters
-            if filters.get('jobType') and job.get('jobType') != filters['jobType']:
-                continue
-            if filters.get('location') and filters['location'].lower() not in job.get('location', '').lower():
-                continue
-            if filters.get('category') and job.get('category') != filters['category']:
-                continue
-            
-            filtered_recommendations.append(rec)
-            
-            if len(filtered_recommendations) >= num_recommendations:
-                break
-        
-        return filtered_recommendations
+        return self.get_recommendations(user_id, num_recommendations, filters=filters)
     
     def get_user_activity_insights(self, user_id: str):
         """Get comprehensive insights about user's job search behavior"""
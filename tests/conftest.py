@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py reads these at import time; no background refresher under test
+os.environ.setdefault('JOBS_REFRESH_INTERVAL', '0')
+os.environ.setdefault('APPWRITE_ENDPOINT', 'http://localhost/v1')
+os.environ.setdefault('JOBS_COLLECTION_ID', 'jobs')
+os.environ.setdefault('USERS_COLLECTION_ID', 'users')
+
+@pytest.fixture
+def databases():
+    from fake_appwrite import FakeDatabases
+    return FakeDatabases()
+
+@pytest.fixture
+def app_module(monkeypatch, databases):
+    """app with a fresh Appwrite client (and caches) backed by the fake databases"""
+    import app
+    from appwrite_client import AppwriteClient
+    from recommendation_engine import JobRecommendationEngine
+
+    appwrite_client = AppwriteClient()
+    appwrite_client.databases = databases
+    monkeypatch.setattr(app, 'appwrite_client', appwrite_client)
+    monkeypatch.setattr(app, 'recommendation_engine', JobRecommendationEngine(appwrite_client))
+    return app
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
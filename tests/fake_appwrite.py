@@ -0,0 +1,68 @@
+"""In-memory stand-in for appwrite's Databases service, enough for the API's queries"""
+import copy
+import json
+import re
+
+from appwrite.exception import AppwriteException
+
+ROLES = ['Python Developer', 'Data Analyst', 'Frontend Engineer', 'ML Intern']
+SKILLS = [['python', 'sql'], ['sql', 'excel'], ['javascript', 'react'], ['python', 'ml']]
+
+def make_jobs(count=12):
+    return [
+        {
+            '$id': f'j{i}', '$updatedAt': '2024-01-01T00:00:00.000+00:00', 'jobId': f'j{i}',
+            'jobRole': ROLES[i % 4], 'companyName': ['Acme', 'Globex', 'Hooli'][i % 3],
+            'description': f'Work on {ROLES[i % 4]} tasks with the team. ' * 5,
+            'location': ['Remote', 'Bangalore', 'Delhi'][i % 3], 'jobType': ['internship', 'full-time'][i % 2],
+            'experienceLevel': 'entry', 'skills': SKILLS[i % 4], 'applyLink': '#', 'stipend': '10k',
+            'category': 'tech'
+        }
+        for i in range(count)
+    ]
+
+class FakeDatabases:
+    def __init__(self):
+        self.collections = {
+            'jobs': {job['$id']: job for job in make_jobs()},
+            'users': {
+                'u1': {'$id': 'u1', 'skills': ['python', 'sql'], 'location': 'Remote',
+                       'experienceLevel': 'entry', 'education': 'BTech'}
+            },
+            'user_activity': {}
+        }
+
+    def list_documents(self, database_id, collection_id, queries=None):
+        documents = list(self.collections[collection_id].values())
+        limit = 25
+        for query in queries or []:
+            method, args = re.match(r'(\w+)\((.*)\)$', query, re.S).groups()
+            if method == 'limit':
+                limit = int(args)
+            elif method in ('equal', 'search'):
+                attribute, values = args.split(',', 1)
+                attribute, values = json.loads(attribute), json.loads(values)
+                if method == 'equal':
+                    documents = [doc for doc in documents if doc.get(attribute) in values]
+                else:
+                    words = [word.lower() for value in values for word in value.split()]
+                    documents = [doc for doc in documents if any(word in str(doc.get(attribute, '')).lower() for word in words)]
+        return {'total': len(documents), 'documents': copy.deepcopy(documents[:limit])}
+
+    def get_document(self, database_id, collection_id, document_id, queries=None):
+        document = self.collections[collection_id].get(document_id)
+        if document is None:
+            raise AppwriteException('Document not found', 404)
+        return copy.deepcopy(document)
+
+    def update_document(self, database_id, collection_id, document_id, data=None, permissions=None):
+        if document_id not in self.collections[collection_id]:
+            raise AppwriteException('Document not found', 404)
+        self.collections[collection_id][document_id].update(data)
+        return copy.deepcopy(self.collections[collection_id][document_id])
+
+    def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+        if document_id in self.collections[collection_id]:
+            raise AppwriteException('Document already exists', 409)
+        self.collections[collection_id][document_id] = {'$id': document_id, **data}
+        return copy.deepcopy(self.collections[collection_id][document_id])
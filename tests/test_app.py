@@ -0,0 +1,98 @@
+def test_personalized_jobs_etag_changes_with_the_profile(client, databases):
+    body = {'user_id': 'u1'}
+    first = client.post('/api/get-personalized-jobs', json=body)
+    assert first.status_code == 200 and first.get_json()['personalized']
+    etag = first.headers['ETag']
+    assert client.post('/api/get-personalized-jobs', json=body, headers={'If-None-Match': etag}).status_code == 304
+
+    databases.collections['users']['u1']['skills'] = ['javascript', 'react']
+    edited = client.post('/api/get-personalized-jobs', json=body, headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert edited.headers['ETag'] != etag
+
+def test_personalized_jobs_etag_changes_when_an_unknown_user_signs_up(client, databases):
+    body = {'user_id': 'u9'}
+    missing = client.post('/api/get-personalized-jobs', json=body)
+    assert missing.get_json()['jobs'] == []
+
+    databases.collections['users']['u9'] = {'$id': 'u9', 'skills': ['python'], 'location': 'Remote'}
+    signed_up = client.post('/api/get-personalized-jobs', json=body, headers={'If-None-Match': missing.headers['ETag']})
+    assert signed_up.status_code == 200
+    assert signed_up.get_json()['jobs']
+
+def test_failed_activity_write_is_logged(client, app_module, monkeypatch, caplog):
+    monkeypatch.setattr(app_module.appwrite_client, 'update_user_activity', lambda user_id, job_id: None)
+    response = client.post('/api/track-activity', json={'user_id': 'u1', 'job_id': 'j1'})
+    assert response.status_code == 202
+    app_module.activity_writer.submit(lambda: None).result()  # Wait for the queued write
+    assert 'Failed to record activity for user u1, job j1' in caplog.text
+
+def test_activity_write_is_recorded(client, app_module, databases):
+    assert client.post('/api/track-activity', json={'user_id': 'u1', 'job_id': 'j3'}).status_code == 202
+    app_module.activity_writer.submit(lambda: None).result()
+    assert '"j3"' in databases.collections['user_activity']['u1']['recent_activities']
+
+def test_batch_recommend_isolates_per_user_failures(client, app_module, monkeypatch):
+    get_recommendations = app_module.recommendation_engine.get_recommendations
+    def failing_for_u2(user_id, *args, **kwargs):
+        if user_id == 'u2':
+            raise RuntimeError('boom')
+        return get_recommendations(user_id, *args, **kwargs)
+    monkeypatch.setattr(app_module.recommendation_engine, 'get_recommendations', failing_for_u2)
+
+    response = client.post('/api/batch-recommend', json={'users': ['u1', 'u2', 'nope'], 'limit': 3})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(result['userId'], result['success']) for result in results] == [('u1', True), ('u2', False), ('nope', True)]
+    assert len(results[0]['recommendations']) == 3
+    assert results[1]['message'] == 'boom'
+    assert results[2]['recommendations'] == []
+
+def test_batch_recommend_caps_the_batch_size(client, app_module):
+    users = [f'u{i}' for i in range(app_module.MAX_BATCH_USERS + 1)]
+    response = client.post('/api/batch-recommend', json={'users': users})
+    assert response.status_code == 400
+    assert client.post('/api/batch-recommend', json={'users': []}).status_code == 400
+
+def test_percent_scores_rounds_every_field(app_module):
+    recs = [{'score': 0.123456, 'skill_score': 1 / 3}, {'score': 0.5, 'skill_score': 0.0}]
+    assert app_module.percent_scores(recs, ('score', 'skill_score')) == [[12.35, 33.33], [50.0, 0.0]]
+    assert app_module.percent_scores([]) == []
+
+def test_gzip_is_negotiated_and_has_its_own_etag(client):
+    import gzip
+    import json
+    url = '/api/search-jobs?q=developer'
+    plain = client.get(url)
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert plain.headers.get('Content-Encoding') is None
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+    refused = client.get(url, headers={'Accept-Encoding': 'gzip;q=0'})
+    assert refused.headers.get('Content-Encoding') is None
+
+    revalidated = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == zipped.headers['ETag']
+    assert 'Accept-Encoding' in revalidated.headers['Vary']
+    assert revalidated.headers['Cache-Control'] == 'private, max-age=30'
+
+    # A client that no longer accepts gzip doesn't get to keep the gzipped body
+    assert client.get(url, headers={'If-None-Match': zipped.headers['ETag']}).status_code == 200
+
+def test_search_streams_ndjson_only_when_asked(client):
+    import json
+    url = '/api/search-jobs?q=developer&limit=3'
+    streamed = client.get(url, headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    assert streamed.mimetype == 'application/x-ndjson'
+    assert streamed.headers.get('Content-Encoding') is None
+    lines = [json.loads(line) for line in streamed.data.splitlines()]
+    assert len(lines) == 3
+
+    default = client.get(url, headers={'Accept': '*/*'})
+    assert default.mimetype == 'application/json'
+    assert default.get_json()['jobs'] == lines
+    assert default.headers['ETag'] != streamed.headers['ETag']
+    assert 'Accept' in default.headers['Vary']
@@ -0,0 +1,69 @@
+from appwrite_client import AppwriteClient, jobs_version
+
+def test_parse_recent_activities_skips_non_string_entries():
+    activity = {'recent_activities': '["j1", 123, null, " j2 ", "0", ""]'}
+    assert AppwriteClient.parse_recent_activities(activity) == ['j1', 'j2']
+
+def test_parse_recent_activities_with_corrupt_json():
+    assert AppwriteClient.parse_recent_activities({'recent_activities': '{bad'}) == []
+    assert AppwriteClient.parse_recent_activities({'recent_activities': '5'}) == []
+
+def test_parse_recent_activities_legacy_fields():
+    activity = {'recent_activity': ' j3', 'recent_activity_2': '0'}
+    assert AppwriteClient.parse_recent_activities(activity) == ['j3']
+
+def test_jobs_version_follows_content():
+    jobs = [{'$id': 'a', '$updatedAt': '1'}, {'$id': 'b', '$updatedAt': '1'}]
+    assert jobs_version(jobs) == jobs_version([dict(job) for job in jobs])
+    assert jobs_version(jobs) != jobs_version([jobs[0], {'$id': 'b', '$updatedAt': '2'}])
+    assert jobs_version(jobs) != jobs_version(jobs[:1])
+
+def make_client(databases):
+    client = AppwriteClient()
+    client.databases = databases
+    return client
+
+def test_unchanged_refetch_keeps_the_cached_list(databases):
+    client = make_client(databases)
+    changes = []
+    first = client._fetch_jobs(['limit(500)'], on_change=changes.append)
+    second = client._fetch_jobs(['limit(500)'], on_change=changes.append)
+    assert second is first
+    assert changes == [first['documents']]
+
+def test_changed_list_is_prepared_before_it_is_cached(databases):
+    client = make_client(databases)
+    first = client._fetch_jobs(['limit(500)'])
+    databases.collections['jobs']['j0']['$updatedAt'] = '2024-02-01T00:00:00.000+00:00'
+
+    def on_change(documents):
+        # Requests still see the previous list while this runs
+        assert client._jobs_cache[('limit(500)',)] is first
+
+    second = client._fetch_jobs(['limit(500)'], on_change=on_change)
+    assert second is not first
+    assert client._jobs_cache[('limit(500)',)] is second
+
+class RecordingDatabases:
+    def __init__(self):
+        self.queries = []
+
+    def list_documents(self, database_id, collection_id, queries=None):
+        self.queries.append(queries)
+        return {'total': 0, 'documents': []}
+
+def test_search_text_drops_quotes_and_backslashes():
+    databases = RecordingDatabases()
+    make_client(databases).get_jobs_by_filters(query='c\\ "dev"\\')
+    searches = sorted(query for queries in databases.queries for query in queries if query.startswith('search('))
+    assert searches == [
+        'search("companyName", ["c   dev"])',
+        'search("description", ["c   dev"])',
+        'search("jobRole", ["c   dev"])',
+    ]
+
+def test_search_text_of_only_escapes_lists_without_search():
+    databases = RecordingDatabases()
+    make_client(databases).get_jobs_by_filters(query='\\"')
+    assert len(databases.queries) == 1
+    assert not any(query.startswith('search(') for query in databases.queries[0])
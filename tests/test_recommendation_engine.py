@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from recommendation_engine import JobRecommendationEngine
+
+JOBS = [
+    {
+        '$id': f'doc{i}', 'jobId': f'j{i}', 'jobRole': role, 'companyName': 'Acme',
+        'description': f'{role} working with {skills}', 'skills': skills.split(', '),
+        'location': 'Remote', 'jobType': 'internship', 'experienceLevel': 'entry', 'category': 'tech'
+    }
+    for i, (role, skills) in enumerate([
+        ('Python Developer', 'python, django, sql'),
+        ('Frontend Developer', 'javascript, react, css'),
+        ('Data Analyst', 'sql, excel, python'),
+    ])
+]
+
+@pytest.fixture
+def engine():
+    return JobRecommendationEngine(appwrite_client=None)
+
+def content_scores(engine, skills):
+    profile = {'skills': skills, 'education': '', 'experienceLevel': ''}
+    return engine.calculate_content_similarity_batch(profile, JOBS, np.arange(len(JOBS)))
+
+def test_content_similarity_with_null_skills(engine):
+    assert content_scores(engine, None).tolist() == [0.0, 0.0, 0.0]
+
+def test_content_similarity_splits_comma_separated_skills(engine):
+    np.testing.assert_allclose(content_scores(engine, 'python, django'), content_scores(engine, ['python', 'django']))
+    assert content_scores(engine, 'python, django')[0] > 0
+
+class CatalogClient:
+    """Just enough of AppwriteClient for get_recommendations: one user, no activity"""
+    def __init__(self, jobs):
+        self.jobs_response = {'documents': jobs}
+
+    def get_user(self, user_id):
+        return {'skills': ['python', 'sql'], 'location': 'Remote', 'experienceLevel': 'entry', 'education': ''}
+
+    def get_user_activity(self, user_id):
+        return None
+
+    def get_jobs(self, limit=100):
+        return self.jobs_response
+
+def test_filtered_recommendations_score_against_the_catalog_index():
+    jobs = [dict(job, jobType=job_type) for job, job_type in zip(JOBS, ['internship', 'full-time', 'internship'])]
+    engine = JobRecommendationEngine(CatalogClient(jobs))
+    ranked = engine.get_recommendations('u1')
+    unfiltered = {rec['job']['jobId']: rec['score'] for rec in ranked}
+    filtered = engine.get_filtered_recommendations('u1', {'jobType': 'internship'})
+    # The unfiltered ranking, minus the full-time job
+    assert [rec['job']['jobId'] for rec in filtered] == [rec['job']['jobId'] for rec in ranked if rec['job']['jobId'] != 'j1']
+    assert all(rec['score'] == unfiltered[rec['job']['jobId']] for rec in filtered)
+    assert len(engine._job_indexes) == 1
+
+def test_top_k_indices_keeps_original_order_for_ties_at_the_boundary(engine):
+    scores = np.array([0.5] * 30 + [0.9, 0.1] * 5)
+    expected = sorted(range(len(scores)), key=lambda i: -scores[i])[:10]
+    assert engine.top_k_indices(scores, 10).tolist() == expected == [30, 32, 34, 36, 38, 0, 1, 2, 3, 4]
+
+def test_top_k_indices_matches_a_stable_sort(engine):
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        scores = rng.integers(0, 4, size=40) / 4
+        k = int(rng.integers(1, 45))
+        expected = sorted(range(len(scores)), key=lambda i: -scores[i])[:k]
+        assert engine.top_k_indices(scores, k).tolist() == expected
+
+def test_concurrent_requests_build_a_new_index_once(engine):
+    import threading
+    import time
+    builds = []
+    build_job_index = engine.build_job_index
+    def slow_build(jobs):
+        builds.append(jobs)
+        time.sleep(0.05)
+        return build_job_index(jobs)
+    engine.build_job_index = slow_build
+
+    jobs = [dict(job) for job in JOBS]
+    threads = [threading.Thread(target=engine.get_job_index, args=(jobs,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1